@@ -1,10 +1,10 @@
 import os
 import streamlit as st
-import shutil
-from langchain_chroma import Chroma
-from langchain.chains import RetrievalQA
+from langchain.chains.question_answering import load_qa_chain
 from langchain_groq import ChatGroq
-from populate_database import fetch_content, split_document, add_to_chroma, clear_database, CHROMA_PATH
+from langchain.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
+from populate_database import fetch_content, split_document, add_to_chroma, clear_database, get_db
 from embedding_model import get_embedding_function
 from dotenv import load_dotenv
 
@@ -14,47 +14,26 @@ st.set_page_config(page_title="News Researcher", layout="wide")
 # Load environment variables
 load_dotenv()
 
-# Check for database deletion marker - without using streamlit commands directly
-def check_deletion_marker():
-    messages = []
-    
-    marker_file = os.path.join(os.path.dirname(CHROMA_PATH), "delete_chroma.marker")
-    
-    if os.path.exists(marker_file):
-        # Wait a moment to ensure file locks are released
-        import time
-        time.sleep(2)
-        
-        try:
-            # Database isn't open yet, so deletion should work
-            if os.path.exists(CHROMA_PATH):
-                # Try to handle locked files
-                try:
-                    shutil.rmtree(CHROMA_PATH)
-                except PermissionError:
-                    # If it fails due to permission, create a notice for manual deletion
-                    messages.append(("error", "Database files are still locked. Please manually delete the 'chroma' folder and restart."))
-                    # We'll still try to remove the marker so we don't get stuck in a loop
-            
-            # Remove the marker file regardless of whether deletion worked
-            if os.path.exists(marker_file):
-                os.remove(marker_file)
-                
-            # Only report success if we actually deleted the folder
-            if not os.path.exists(CHROMA_PATH):
-                messages.append(("success", "Database cleared successfully on startup"))
-            return True, messages
-        except Exception as e:
-            if os.path.exists(marker_file):
-                try:
-                    os.remove(marker_file)
-                except:
-                    pass
-            messages.append(("error", f"Failed to clear database on startup: {str(e)}"))
-    return False, messages
+# Persist LLM responses so a repeated question skips the Groq API call
+LLM_CACHE_PATH = ".langchain.db"
 
-# Call the function
-db_cleared, messages = check_deletion_marker()
+@st.cache_resource
+def get_llm_cache():
+    return SQLiteCache(database_path=LLM_CACHE_PATH)
+
+set_llm_cache(get_llm_cache())
+
+# Cached handles survive Streamlit reruns, so they are only built once
+@st.cache_resource
+def get_llm():
+    return ChatGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        model_name="llama-3.3-70b-versatile"
+    )
+
+@st.cache_resource
+def get_qa_chain():
+    return load_qa_chain(get_llm(), chain_type="stuff")
 
 # Initialize session state to store processed URLs
 if "processed_urls" not in st.session_state:
@@ -64,15 +43,6 @@ if "processed_urls" not in st.session_state:
 st.title("📰 News Researcher")
 st.markdown("Enter news article URLs and ask questions about them.")
 
-# Display any messages from the database check
-for msg_type, msg_text in messages:
-    if msg_type == "success":
-        st.success(msg_text)
-    elif msg_type == "error":
-        st.error(msg_text)
-    else:
-        st.info(msg_text)
-
 # URL input section
 with st.expander("News Sources", expanded=True):
     with st.form("url_form"):
@@ -88,18 +58,24 @@ with st.expander("News Sources", expanded=True):
     
     if process_button:
         urls = [url for url in [url1, url2, url3] if url]
+        # Only fetch and embed URLs that haven't been processed yet
+        new_urls = [url for url in urls if url not in st.session_state.processed_urls]
         if not urls:
             st.warning("Please enter at least one URL.")
+        elif not new_urls:
+            st.info("These articles have already been processed.")
         else:
             with st.spinner("Fetching and processing articles..."):
                 # Fetch content from URLs
-                documents = fetch_content(urls)
+                documents = fetch_content(new_urls)
                 if documents:
                     # Split into chunks
                     chunks = split_document(documents)
                     # Store in vector DB
                     add_to_chroma(chunks)
-                    st.session_state.processed_urls = urls
+                    # Failed URLs stay out of the set so they can be retried
+                    fetched = {doc.metadata["source"] for doc in documents}
+                    st.session_state.processed_urls = sorted(set(st.session_state.processed_urls) | fetched)
                     st.success(f"Processed {len(documents)} articles successfully!")
                 else:
                     st.error("No content could be retrieved from the provided URLs.")
@@ -119,37 +95,24 @@ if st.session_state.processed_urls:
     question = st.text_input("What would you like to know about these articles?")
     
     if question:
-        if os.path.exists(CHROMA_PATH):
+        db = get_db()
+        if db._collection.count():
             with st.spinner("Researching an answer..."):
-                # Set up the retrieval system
-                embeddings = get_embedding_function()
-                db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings)
-                retriever = db.as_retriever(search_kwargs={"k": 5})
-                
-                # Set up the QA model
-                llm = ChatGroq(
-                    api_key=os.getenv("GROQ_API_KEY"),
-                    model_name="llama-3.3-70b-versatile"
-                )
-                
-                # Create QA chain
-                qa_chain = RetrievalQA.from_chain_type(
-                    llm=llm,
-                    chain_type="stuff",
-                    retriever=retriever,
-                )
-                
                 # Run the query
                 try:
-                    response = qa_chain.invoke({"query": question})
+                    # Embed the question once and hand the same documents to
+                    # the chain and the Sources expander
+                    query_vector = get_embedding_function().embed_query(question)
+                    docs = db.similarity_search_by_vector(query_vector, k=5)
+                    response = get_qa_chain().invoke({"input_documents": docs, "question": question})
                     
                     # Display the answer
                     st.markdown("### Answer:")
-                    st.write(response["result"])
+                    st.write(response["output_text"])
                     
                     # Display sources
                     with st.expander("Sources"):
-                        for doc in retriever.invoke(question):
+                        for doc in docs:
                             st.markdown(f"**Source:** {doc.metadata.get('source', 'Unknown')}")
                             st.markdown(f"**Excerpt:** {doc.page_content[:300]}...")
                             st.markdown("---")
@@ -0,0 +1,71 @@
+"""HTML-to-markdown extraction, kept free of the app's heavy imports so that
+parse worker processes start quickly."""
+from bs4 import BeautifulSoup, NavigableString
+
+CONTENT_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'blockquote']
+EXCLUDED_TAGS = ['script', 'style', 'meta', 'noscript', 'header', 'footer', 'nav']
+_HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_CONTAINERS = ['article', 'main', 'body']
+_CONTENT_SELECTOR = ', '.join(CONTENT_TAGS)
+
+def _is_visible(string):
+    """Whether a string is shown text outside any excluded tag (comments and
+    script/style strings are not plain NavigableStrings)"""
+    return type(string) is NavigableString and string.find_parent(EXCLUDED_TAGS) is None
+
+def _text(tag):
+    """Stripped text of a tag, like get_text(strip=True) but without excluded tags"""
+    return ''.join(string.strip() for string in tag.find_all(string=True) if _is_visible(string))
+
+def _list_item_text(list_tag, li):
+    """Text of a list item, leaving out the items of any list nested inside it"""
+    return ''.join(
+        string.strip() for string in li.find_all(string=True)
+        if _is_visible(string) and string.find_parent(['ul', 'ol']) is list_tag
+    )
+
+def extract_text(html):
+    """Parse an HTML page and convert its main content to markdown-like text"""
+    # lxml is a C parser and does its own encoding detection on raw bytes
+    soup = BeautifulSoup(html, 'lxml')
+    
+    # Select the content tags of the first article, falling back to the main
+    # content area and then the whole body, with one CSS query per container.
+    # Script, style and navigation content is skipped without mutating the
+    # tree, both for the containers and for the tags inside them
+    elements = []
+    for container_name in _CONTAINERS:
+        container = next(
+            (tag for tag in soup.select(container_name) if tag.find_parent(EXCLUDED_TAGS) is None),
+            None,
+        )
+        if container is not None:
+            elements = [
+                tag for tag in container.select(_CONTENT_SELECTOR)
+                if tag.find_parent(EXCLUDED_TAGS) is None
+            ]
+            if elements:
+                break
+    
+    # Get text and convert to markdown-like format, collecting fragments
+    # in a list and joining once at the end
+    parts = []
+    
+    # Extract headings with hierarchy
+    for tag in elements:
+        name = tag.name
+        level = _HEADINGS.get(name)
+        if level:
+            parts.append('#' * level + ' ' + _text(tag) + '\n\n')
+        elif name == 'p':
+            parts.append(_text(tag) + '\n\n')
+        elif name == 'blockquote':
+            parts.append('> ' + _text(tag) + '\n\n')
+        else:
+            # Only direct children and their own text, nested lists are
+            # visited on their own
+            for li in tag.find_all('li', recursive=False):
+                parts.append('* ' + _list_item_text(tag, li) + '\n')
+            parts.append('\n')
+    
+    return ''.join(parts)
@@ -1,11 +1,14 @@
-import os
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from dotenv import load_dotenv
+import streamlit as st
+from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 
-load_dotenv()
+# Local ONNX model (384 dimensions), so embedding needs no API round-trips
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+# Vectors from different models can't share a collection, so the collection
+# is named after the model; data from an older model is simply not used
+COLLECTION_NAME = "news_bge_small_en_v1_5"
 
-os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
+@st.cache_resource
 def get_embedding_function():
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+    embeddings = FastEmbedEmbeddings(model_name=EMBEDDING_MODEL)
 
     return embeddings
\ No newline at end of file
@@ -1,107 +1,199 @@
+import asyncio
+import functools
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import aiohttp
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
 from langchain_chroma import Chroma
-from embedding_model import get_embedding_function
+from embedding_model import get_embedding_function, COLLECTION_NAME
+from article_parser import extract_text
 
 CHROMA_PATH = "chroma"
 
-def fetch_content(urls):
-    """Fetch content from URLs using requests and BeautifulSoup"""
-    content = []
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    for url in urls:
+# Splitter settings; separators prefer the heading boundaries article_parser.extract_text emits
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 200
+CHUNK_SEPARATORS = ["\n\n## ", "\n\n# ", "\n\n", "\n", ". ", " ", ""]
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+MAX_CONCURRENT_FETCHES = 5
+PARSE_WORKERS = min(MAX_CONCURRENT_FETCHES, os.cpu_count() or 1)
+POOL_SIZE = 8
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.3
+READ_CHUNK_SIZE = 64 * 1024
+MAX_PAGE_SIZE = 4 * 1024 * 1024
+
+async def _download(session, url):
+    """GET a URL over the pooled session, retrying dropped connections with backoff"""
+    for attempt in range(MAX_RETRIES + 1):
         try:
-            st.info(f"Fetching content from {url}...")
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            # Parse HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script_or_style in soup(['script', 'style', 'meta', 'noscript', 'header', 'footer', 'nav']):
-                script_or_style.decompose()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                response.raise_for_status()
+                # don't download PDFs, videos and other non-HTML bodies
+                if not response.content_type.startswith('text/html'):
+                    raise ValueError(f"unsupported content type {response.content_type}")
                 
-            # Extract article content
-            article = soup.find('article')
-            if article:
-                main_content = article
-            else:
-                # If no article tag, try to find main content area
-                main = soup.find('main')
-                if main:
-                    main_content = main
-                else:
-                    # Fallback to body content
-                    main_content = soup.body
-            
-            # Get text and convert to markdown-like format
-            text = ""
-            
-            # Extract headings with hierarchy
-            for tag in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'blockquote']):
-                if tag.name.startswith('h'):
-                    level = int(tag.name[1])
-                    text += '#' * level + ' ' + tag.get_text(strip=True) + '\n\n'
-                elif tag.name == 'p':
-                    text += tag.get_text(strip=True) + '\n\n'
-                elif tag.name == 'blockquote':
-                    text += '> ' + tag.get_text(strip=True) + '\n\n'
-                elif tag.name in ['ul', 'ol']:
-                    for li in tag.find_all('li'):
-                        text += '* ' + li.get_text(strip=True) + '\n'
-                    text += '\n'
-            
-            if text:
-                content.append(Document(page_content=text, metadata={"source": url}))
-                st.success(f"Successfully processed {url}")
-            else:
-                st.warning(f"No content extracted from {url}")
-                
-        except Exception as e:
-            st.error(f"Failed to fetch {url}: {str(e)}")
+                # stream the body so pathological pages fail early with bounded memory
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                    body.extend(chunk)
+                    if len(body) > MAX_PAGE_SIZE:
+                        raise ValueError(f"page is larger than {MAX_PAGE_SIZE // (1024 * 1024)} MiB")
+                return bytes(body)
+        except aiohttp.ClientConnectionError:
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+@st.cache_resource
+def _get_parse_pool():
+    """Long-lived process pool for HTML parsing.
+    
+    Workers are spawned rather than forked, since forking the threaded
+    Streamlit server can deadlock the child. Each spawned worker still
+    re-imports the parent's __main__ (the streamlit console script), so the
+    pool is created once and reused; the parse task itself only loads
+    article_parser rather than this module.
+    """
+    return ProcessPoolExecutor(
+        max_workers = PARSE_WORKERS, mp_context = multiprocessing.get_context("spawn")
+    )
+
+async def _parse(html):
+    """Run extract_text in the parse pool, replacing the pool if a worker died"""
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        executor = _get_parse_pool()
+        try:
+            return await loop.run_in_executor(executor, extract_text, html)
+        except BrokenProcessPool:
+            # a dead worker breaks the whole pool; drop it (unless another
+            # page already has) so later parses get a fresh one, then retry once
+            if _get_parse_pool() is executor:
+                _get_parse_pool.clear()
+                executor.shutdown(wait=False)
+            if attempt:
+                raise
+
+async def _fetch_one(session, semaphore, url):
+    """Download a single URL and extract its text, returning (document, message)"""
+    try:
+        async with semaphore:
+            html = await _download(session, url)
+        
+        # Parsing is CPU-bound, run it in another process so pages parse in
+        # parallel across cores while other downloads continue
+        text = await _parse(html)
+        
+        if text:
+            return Document(page_content=text, metadata={"source": url}), ("success", f"Successfully processed {url}")
+        return None, ("warning", f"No content extracted from {url}")
+    except Exception as e:
+        return None, ("error", f"Failed to fetch {url}: {str(e)}")
+
+async def _fetch_all(urls):
+    """Fetch all URLs concurrently over a shared session"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    # Keep-alive connections are reused across URLs on the same host
+    connector = aiohttp.TCPConnector(limit=POOL_SIZE, limit_per_host=POOL_SIZE)
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(_fetch_one(session, semaphore, url)) for url in urls]
+    return [task.result() for task in tasks]
+
+def fetch_content(urls):
+    """Fetch content from URLs concurrently using aiohttp and BeautifulSoup"""
+    for url in urls:
+        st.info(f"Fetching content from {url}...")
+    
+    results = asyncio.run(_fetch_all(urls))
+    
+    # Report from the script thread once all downloads are done, so Streamlit
+    # calls never happen inside the coroutines
+    content = []
+    for document, (msg_type, msg_text) in results:
+        if document:
+            content.append(document)
+        if msg_type == "success":
+            st.success(msg_text)
+        elif msg_type == "warning":
+            st.warning(msg_text)
+        else:
+            st.error(msg_text)
     
     return content
 
+# the text splitter (RecursiveCharacterTextSplitter) is built once at import.
+# length_function stays len: it is O(1) per candidate, whereas a tokenizer
+# call here would re-encode every candidate the splitter tries
+_TEXT_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size = CHUNK_SIZE,
+    chunk_overlap = CHUNK_OVERLAP,
+    separators = CHUNK_SEPARATORS,
+    length_function = len,
+    is_separator_regex = False,
+)
+
 def split_document(documents: list[Document]):
-    # initialize the text splitter (RecursiveCharacterTextSplitter) and split the documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size = 800,
-        chunk_overlap = 80,
-        length_function = len,
-        is_separator_regex = False,
+    # split the documents into chunks
+    return _TEXT_SPLITTER.split_documents(documents)
+
+@functools.lru_cache(maxsize=1)
+def get_db():
+    """Return the shared vector database (Chroma) handle, opened once per process"""
+    return Chroma(
+        collection_name = COLLECTION_NAME,
+        persist_directory = CHROMA_PATH,
+        embedding_function = get_embedding_function(),
     )
-    return text_splitter.split_documents(documents)
 
 def add_to_chroma(chunks: list[Document]):
-    # initialization of vector database (Chroma)
-    db = Chroma(
-        persist_directory = CHROMA_PATH, embedding_function = get_embedding_function()
+    embeddings = get_embedding_function()
+    db = get_db()
+    
+    # content-hash ids over source + text: re-ingesting a URL maps its chunks
+    # to the ids already stored, so they are never embedded again, while the
+    # same text from another URL (e.g. syndicated copy) keeps its own source
+    new_chunks = {}
+    for chunk in chunks:
+        key = chunk.metadata.get("source", "") + "\0" + chunk.page_content
+        chunk_id = hashlib.sha256(key.encode()).hexdigest()[:16]
+        new_chunks.setdefault(chunk_id, chunk)
+    
+    existing = set(db._collection.get(ids=list(new_chunks), include=[])["ids"])
+    for chunk_id in existing:
+        del new_chunks[chunk_id]
+    
+    if not new_chunks:
+        return db
+    
+    texts = [chunk.page_content for chunk in new_chunks.values()]
+    db._collection.add(
+        ids = list(new_chunks),
+        documents = texts,
+        metadatas = [chunk.metadata for chunk in new_chunks.values()],
+        # FastEmbed batches internally and already uses every core
+        embeddings = embeddings.embed_documents(texts),
     )
-    db.add_documents(chunks)
     return db
 
 def clear_database():
-    """Mark database for deletion on next application startup"""
-    import os
-    
-    # Create a marker file instead of trying to delete while running
-    marker_file = os.path.join(os.path.dirname(CHROMA_PATH), "delete_chroma.marker")
-    
+    """Delete every stored vector in-process, keeping the persist directory"""
     try:
-        # Create a marker file
-        with open(marker_file, 'w') as f:
-            f.write("delete")
+        db = get_db()
+        # drop the collection; unlike removing the folder this works while
+        # the database files are open. The next get_db() recreates it empty
+        db._client.delete_collection(db._collection.name)
+        get_db.cache_clear()
         
-        st.success("Database marked for deletion")
-        st.warning("To complete database clearing, please:")
-        st.info("1. Close this browser tab\n2. Stop the Streamlit server with Ctrl+C in your terminal\n3. Run 'streamlit run app.py' again")
-            
+        st.success("Database cleared successfully")
     except Exception as e:
-        st.error(f"Error marking database for deletion: {str(e)}")
\ No newline at end of file
+        st.error(f"Error clearing database: {str(e)}")